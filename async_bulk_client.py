@@ -0,0 +1,424 @@
+import asyncio
+import json
+import os
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+
+from config import SHOPIFY_API_URL, SHOPIFY_HEADERS
+
+TERMINAL_STATUSES = {"COMPLETED", "FAILED", "CANCELED"}
+
+BULK_RUN_MUTATION = '''
+      mutation {{
+        bulkOperationRunQuery(
+          query: """
+      {graphql_query}
+      """
+        ) {{
+          bulkOperation {{
+            id
+            status
+          }}
+          userErrors {{
+            field
+            message
+          }}
+        }}
+      }}
+      '''
+
+BULK_STATUS_QUERY = '''
+      {{
+        node(id: "{operation_id}") {{
+          ... on BulkOperation {{
+            id
+            status
+            errorCode
+            createdAt
+            completedAt
+            objectCount
+            fileSize
+            url
+          }}
+        }}
+      }}
+      '''
+
+BULK_CANCEL_MUTATION = '''
+      mutation {{
+        bulkOperationCancel(id: "{operation_id}") {{
+          bulkOperation {{
+            id
+            status
+          }}
+          userErrors {{
+            field
+            message
+          }}
+        }}
+      }}
+      '''
+
+
+class BulkOperationError(Exception):
+    """Raised when a bulk operation response fails validation.
+
+    ``payload`` holds the offending part of the response for logging.
+    """
+
+    def __init__(self, message: str, payload=None):
+        super().__init__(message)
+        self.message = message
+        self.payload = payload
+
+
+def parse_create_result(create_result) -> Tuple[str, str]:
+    """Validate a bulkOperationRunQuery response; returns (operation_id, status)."""
+    # Basic shape/transport error checks
+    if not isinstance(create_result, dict):
+        raise BulkOperationError(f"Error: Unexpected response type when creating bulk op: {type(create_result)}")
+
+    if "errors" in create_result and create_result["errors"]:
+        raise BulkOperationError("Error creating bulk operation (top-level errors):", create_result)
+
+    data_block = create_result.get("data")
+    if not data_block:
+        raise BulkOperationError("Error: Response did not include 'data' when creating bulk op.", create_result)
+
+    bulk_run = data_block.get("bulkOperationRunQuery")
+    if not bulk_run:
+        raise BulkOperationError("Error: 'data.bulkOperationRunQuery' missing or null.", create_result)
+
+    user_errors = bulk_run.get("userErrors") or []
+    if user_errors:
+        raise BulkOperationError("User errors returned when creating bulk operation:", user_errors)
+
+    bulk_operation = bulk_run.get("bulkOperation")
+    if not bulk_operation:
+        raise BulkOperationError("Error: 'data.bulkOperationRunQuery.bulkOperation' missing or null.", create_result)
+
+    operation_id = bulk_operation.get("id")
+    status = bulk_operation.get("status")
+    if not operation_id or not status:
+        raise BulkOperationError("Error: Bulk operation 'id' or 'status' missing.", create_result)
+
+    return operation_id, status
+
+
+def parse_status_result(status_result) -> dict:
+    """Validate a bulk operation status response; returns the BulkOperation node."""
+    if not isinstance(status_result, dict):
+        raise BulkOperationError(f"Error: Unexpected response type when checking status: {type(status_result)}")
+
+    if "errors" in status_result and status_result["errors"]:
+        raise BulkOperationError("Error checking bulk operation status (top-level errors):", status_result)
+
+    status_data = status_result.get("data")
+    if not status_data:
+        raise BulkOperationError("Error: No 'data' in status check response.", status_result)
+
+    node_data = status_data.get("node")
+    if not node_data:
+        raise BulkOperationError("Error: 'data.node' missing or null in status check response.", status_result)
+
+    if not node_data.get("status"):
+        raise BulkOperationError("Error: 'status' missing in node data.", status_result)
+
+    return node_data
+
+
+class AsyncBulkClient:
+    """asyncio client for Shopify bulk operations on one store.
+
+    Use it as an async context manager. One client (and its connection pool)
+    can drive any number of concurrent operations and downloads.
+    ``download_timeout`` bounds each read of a results download, not the whole
+    transfer.
+    """
+
+    def __init__(
+        self,
+        api_url: str = SHOPIFY_API_URL,
+        headers: dict = SHOPIFY_HEADERS,
+        rate_limiter=None,
+        request_timeout: float = 60,
+        download_timeout: float = 300,
+        poll_interval: float = 5,
+        poll_retries: int = 3,
+        max_connections: int = 100,
+    ):
+        self.api_url = api_url
+        self.headers = headers
+        self.rate_limiter = rate_limiter
+        self.request_timeout = request_timeout
+        self.download_timeout = download_timeout
+        self.poll_interval = poll_interval
+        self.poll_retries = poll_retries
+        self.max_connections = max_connections
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            raise RuntimeError("AsyncBulkClient must be used as 'async with AsyncBulkClient(...)'")
+        return self._session
+
+    async def _throttle(self) -> None:
+        """Wait on the rate limiter, if any, without blocking the event loop."""
+        if self.rate_limiter is None:
+            return
+        acquire_async = getattr(self.rate_limiter, "acquire_async", None)
+        if acquire_async is not None:
+            await acquire_async()
+        else:
+            await asyncio.to_thread(self.rate_limiter.acquire)
+
+    async def graphql(self, query: str) -> dict:
+        """POST a GraphQL document to the Admin API and return the decoded JSON."""
+        await self._throttle()
+        async with self.session.post(
+            self.api_url,
+            headers=self.headers,
+            json={"query": query},
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+        ) as response:
+            body = await response.text()
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            # e.g. an HTML 502/503 page from Shopify's edge
+            raise BulkOperationError(
+                f"Error: Non-JSON response (HTTP {response.status}) from the Admin API.", body[:500]
+            )
+
+    async def create_bulk_operation(self, graphql_query: str) -> dict:
+        """Create a bulk operation to execute the provided GraphQL query document."""
+        return await self.graphql(BULK_RUN_MUTATION.format(graphql_query=graphql_query))
+
+    async def check_bulk_operation_status(self, operation_id: str) -> dict:
+        """Check the status of a bulk operation by ID."""
+        return await self.graphql(BULK_STATUS_QUERY.format(operation_id=operation_id))
+
+    async def cancel_bulk_operation(self, operation_id: str) -> dict:
+        """Ask Shopify to cancel a running bulk operation."""
+        return await self.graphql(BULK_CANCEL_MUTATION.format(operation_id=operation_id))
+
+    async def start(self, graphql_query: str) -> Tuple[str, str]:
+        """Create a bulk operation and validate the response; returns (operation_id, status)."""
+        return parse_create_result(await self.create_bulk_operation(graphql_query))
+
+    async def wait_for_completion(self, operation_id: str, status: str = "CREATED", on_status=None) -> dict:
+        """Poll until the operation reaches a terminal status; returns the final node.
+
+        ``on_status`` is called with each non-terminal status before sleeping.
+        A failed status check (e.g. THROTTLED, or a 5xx page) does not end the
+        wait: up to ``poll_retries`` consecutive failures are retried with a
+        growing delay before the last error is raised.
+        """
+        node_data = {"id": operation_id, "status": status}
+        failures = 0
+        while node_data["status"] not in TERMINAL_STATUSES:
+            if on_status is not None:
+                on_status(node_data["status"])
+            await asyncio.sleep(self.poll_interval * 2 ** failures)
+            try:
+                node_data = parse_status_result(await self.check_bulk_operation_status(operation_id))
+                failures = 0
+            except (BulkOperationError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                failures += 1
+                if failures > self.poll_retries:
+                    raise
+                print(f"Status check failed ({failures}/{self.poll_retries}), retrying: {e}")
+        return node_data
+
+    def _download_client_timeout(self) -> aiohttp.ClientTimeout:
+        # Multi-GB exports take longer than any fixed total, so only bound each read
+        return aiohttp.ClientTimeout(total=None, sock_read=self.download_timeout)
+
+    async def download_text(self, url: str) -> str:
+        """Download the bulk operation results from the signed URL into memory."""
+        # The signed URL must not receive the Shopify access token
+        async with self.session.get(url, timeout=self._download_client_timeout()) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    async def download_to_file(self, url: str, path: str, chunk_size: int = 1 << 20) -> Tuple[int, int]:
+        """Stream the results from the signed URL to ``path``; returns (lines, bytes).
+
+        Data is written to ``<path>.part`` and moved into place only once complete,
+        so a cancelled or failed download never leaves a truncated file behind.
+        """
+        part_path = f"{path}.part"
+        lines = 0
+        size = 0
+        last_byte = b"\n"
+        try:
+            async with self.session.get(url, timeout=self._download_client_timeout()) as response:
+                response.raise_for_status()
+                with open(part_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+                        lines += chunk.count(b"\n")
+                        last_byte = chunk[-1:]
+            os.replace(part_path, path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        if last_byte != b"\n":
+            lines += 1
+        return lines, size
+
+
+def _print_error(error: BulkOperationError) -> None:
+    print(error.message)
+    if error.payload is not None:
+        print(json.dumps(error.payload, indent=2))
+
+
+async def run_bulk_operation(
+    client: AsyncBulkClient,
+    query_key: str,
+    query_info: dict,
+    output_dir: str = "bulk_data",
+    timeout: Optional[float] = None,
+) -> Optional[Tuple[int, int]]:
+    """Run a single bulk operation and save results.
+
+    Returns the (lines, bytes) written on success and None on failure.
+    ``timeout`` bounds the wait for Shopify to finish the operation. On timeout
+    or task cancellation the bulk operation is cancelled on Shopify's side too.
+    """
+    print(f"\n{'='*60}")
+    print(f"Running: {query_info['name']}")
+    print(f"Description: {query_info['description']}")
+    print(f"{'='*60}")
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Creating bulk operation...")
+    try:
+        operation_id, status = await client.start(query_info['query'])
+    except BulkOperationError as e:
+        _print_error(e)
+        return None
+
+    print(f"Bulk operation created with ID: {operation_id}")
+    print(f"Initial status: {status}")
+
+    # Poll for completion. The deadline is enforced with asyncio.wait rather than
+    # wait_for so a timed-out HTTP request is not mistaken for the operation deadline.
+    poll = asyncio.ensure_future(
+        client.wait_for_completion(
+            operation_id, status, on_status=lambda s: print(f"Operation status: {s}")
+        )
+    )
+    try:
+        done, _ = await asyncio.wait({poll}, timeout=timeout)
+    except asyncio.CancelledError:
+        poll.cancel()
+        await asyncio.shield(_cancel_quietly(client, operation_id))
+        raise
+
+    if not done:
+        poll.cancel()
+        print(f"Bulk operation did not finish within {timeout} seconds; cancelling.")
+        await _cancel_quietly(client, operation_id)
+        return None
+
+    # If polling gives up, cancel the operation so it does not keep the shop's
+    # single bulk query slot busy and block the next attempt
+    try:
+        node_data = poll.result()
+    except BulkOperationError as e:
+        _print_error(e)
+        await _cancel_quietly(client, operation_id)
+        return None
+    except Exception:
+        await _cancel_quietly(client, operation_id)
+        raise
+
+    status = node_data["status"]
+    if status == "COMPLETED":
+        print("Bulk operation completed!")
+        print(f"Objects processed: {node_data.get('objectCount', 'N/A')}")
+        print(f"File size: {node_data.get('fileSize', 'N/A')} bytes")
+
+        signed_url = node_data.get("url")
+        filename = f"{output_dir}/{query_key}_data.jsonl"
+        if not signed_url:
+            # Shopify returns no URL when the query matched nothing
+            if str(node_data.get("objectCount")) == "0":
+                open(filename, "wb").close()
+                print(f"No objects matched; wrote empty {filename}")
+                return 0, 0
+            print("No results URL was returned despite COMPLETED status.")
+            return None
+
+        print("Downloading results...")
+        line_count, size = await client.download_to_file(signed_url, filename)
+        print(f"Results saved to {filename}")
+        print(f"Downloaded {line_count} JSONL lines.")
+        return line_count, size
+
+    elif status == "FAILED":
+        print("Bulk operation failed!")
+        print(f"Error code: {node_data.get('errorCode', 'N/A')}")
+        return None
+    else:
+        # CANCELED or other terminal state
+        print(f"Bulk operation ended with terminal status: {status}")
+        return None
+
+
+async def _cancel_quietly(client: AsyncBulkClient, operation_id: str) -> None:
+    """Best-effort server-side cancel; failures are reported, not raised."""
+    try:
+        await client.cancel_bulk_operation(operation_id)
+        print(f"Requested cancellation of bulk operation {operation_id}")
+    except Exception as e:
+        print(f"Could not cancel bulk operation {operation_id}: {e}")
+
+
+async def run_bulk_operations(
+    client: AsyncBulkClient,
+    queries: Dict[str, dict],
+    output_dir: str = "bulk_data",
+    concurrency: int = 1,
+    timeout: Optional[float] = None,
+) -> Dict[str, Optional[Tuple[int, int]]]:
+    """Run several bulk operations on one event loop, at most ``concurrency`` at a time.
+
+    Maps each query key to the (lines, bytes) it downloaded, or None if it failed.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(query_key: str, query_info: dict) -> Optional[Tuple[int, int]]:
+        async with semaphore:
+            try:
+                return await run_bulk_operation(client, query_key, query_info, output_dir, timeout)
+            except Exception as e:
+                # One bad operation must not abort its siblings in the gather below
+                print(f"Exception occurred while running {query_key}: {e}")
+                return None
+
+    results = await asyncio.gather(
+        *(run_one(key, info) for key, info in queries.items())
+    )
+    return dict(zip(queries, results))
@@ -1,7 +1,11 @@
 import os
 import re
 import sys
-from typing import List
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
 
 from dotenv import load_dotenv
 from google.cloud import bigquery
@@ -15,12 +19,22 @@ BIGQUERY_DATASET = os.getenv("BIGQUERY_DATASET", "shopify_raw")
 BIGQUERY_LOCATION = os.getenv("BIGQUERY_LOCATION", "US")
 WRITE_DISPOSITION = os.getenv("BIGQUERY_WRITE_DISPOSITION", "WRITE_TRUNCATE")  # WRITE_TRUNCATE | WRITE_APPEND | WRITE_EMPTY
 
+# Files larger than this are uploaded as parallel shards of about this size
+SHARD_SIZE_BYTES = int(os.getenv("BIGQUERY_SHARD_SIZE_BYTES", str(256 * 1024 * 1024)))
+SHARD_UPLOAD_WORKERS = int(os.getenv("BIGQUERY_SHARD_UPLOAD_WORKERS", "8"))
+SHARD_MAX_RETRIES = int(os.getenv("BIGQUERY_SHARD_MAX_RETRIES", "3"))
+# Staging tables expire on their own if a run dies before cleaning them up
+STAGING_TABLE_EXPIRATION_HOURS = int(os.getenv("BIGQUERY_STAGING_EXPIRATION_HOURS", "24"))
+
 # Directories to scan for JSONL files
 SEARCH_DIRS: List[str] = [
     "bulk_data",
     ".",
 ]
 
+# Per-store output of multi_store_pipeline.py lives in <STORE_DATA_ROOT>/<store>/
+STORE_DATA_ROOT = "bulk_data"
+
 
 def sanitize_table_name(filename: str) -> str:
     """Convert a filename to a valid BigQuery table name."""
@@ -36,9 +50,29 @@ def sanitize_table_name(filename: str) -> str:
     return name[:1024]
 
 
+def table_name_for_path(path: str) -> str:
+    """Table name for a discovered file, prefixed with the store for per-store output."""
+    table_name = sanitize_table_name(path)
+    parent = os.path.dirname(os.path.normpath(path))
+    if os.path.dirname(parent) == os.path.normpath(STORE_DATA_ROOT):
+        table_name = f"{sanitize_table_name(os.path.basename(parent))}__{table_name}"
+    return table_name[:1024]
+
+
+def store_data_dirs() -> List[str]:
+    """List the per-store output directories under STORE_DATA_ROOT."""
+    if not os.path.isdir(STORE_DATA_ROOT):
+        return []
+    return sorted(
+        os.path.join(STORE_DATA_ROOT, entry)
+        for entry in os.listdir(STORE_DATA_ROOT)
+        if os.path.isdir(os.path.join(STORE_DATA_ROOT, entry))
+    )
+
+
 def discover_jsonl_files() -> List[str]:
     files: List[str] = []
-    for dir_path in SEARCH_DIRS:
+    for dir_path in SEARCH_DIRS + store_data_dirs():
         if not os.path.isdir(dir_path):
             continue
         for entry in os.listdir(dir_path):
@@ -63,25 +97,198 @@ def ensure_dataset(client: bigquery.Client, dataset_id: str, location: str) -> N
         client.create_dataset(dataset_ref, exists_ok=True)
 
 
+def _load_job_config(write_disposition: str, schema=None) -> bigquery.LoadJobConfig:
+    job_config = bigquery.LoadJobConfig()
+    job_config.source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+    if schema is None:
+        job_config.autodetect = True
+    else:
+        job_config.schema = schema
+    job_config.write_disposition = write_disposition
+    return job_config
+
+
+def shard_ranges(file_path: str, shard_size: int) -> List[Tuple[int, int]]:
+    """Split a file into (offset, length) byte ranges of about ``shard_size`` that end on line boundaries."""
+    total = os.path.getsize(file_path)
+    ranges: List[Tuple[int, int]] = []
+    start = 0
+    with open(file_path, "rb") as f:
+        while start < total:
+            target = start + max(1, shard_size)
+            if target >= total:
+                end = total
+            else:
+                # Finish the line that contains the last byte of the shard
+                f.seek(target - 1)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end - start))
+            start = end
+    return ranges
+
+
+RECORD_TYPES = ("RECORD", "STRUCT")
+NUMERIC_TYPES = ("INTEGER", "INT64", "FLOAT", "FLOAT64")
+# Types that autodetect infers from JSON strings; a STRING column can load any of them
+STRING_ENCODED_TYPES = ("STRING", "TIMESTAMP", "DATETIME", "DATE", "TIME")
+
+
+def _merge_field(a: bigquery.SchemaField, b: bigquery.SchemaField, path: str) -> bigquery.SchemaField:
+    if a == b:
+        return a
+    if "REPEATED" in (a.mode, b.mode) and a.mode != b.mode:
+        raise ValueError(
+            f"Cannot merge shard schemas: field '{path}' is {a.mode} in one shard and {b.mode} in another"
+        )
+    fields = ()
+    if a.field_type in RECORD_TYPES and b.field_type in RECORD_TYPES:
+        field_type = "RECORD"
+        fields = merge_schemas([a.fields, b.fields], f"{path}.")
+    elif a.field_type == b.field_type:
+        field_type = a.field_type
+    elif a.field_type in NUMERIC_TYPES and b.field_type in NUMERIC_TYPES:
+        field_type = "FLOAT"
+    elif a.field_type in STRING_ENCODED_TYPES and b.field_type in STRING_ENCODED_TYPES:
+        field_type = "STRING"
+    else:
+        raise ValueError(
+            f"Cannot merge shard schemas: field '{path}' is {a.field_type} in one shard "
+            f"and {b.field_type} in another; load this file with an explicit schema"
+        )
+    mode = "REPEATED" if a.mode == "REPEATED" else "NULLABLE"
+    return bigquery.SchemaField(a.name, field_type, mode=mode, fields=fields)
+
+
+def merge_schemas(schemas, prefix: str = "") -> List[bigquery.SchemaField]:
+    """Union autodetected schemas by field name, widening compatible types.
+
+    Raises ValueError for conflicts no single schema can load (record vs
+    scalar, repeated vs non-repeated, or e.g. BOOLEAN vs STRING).
+    """
+    merged: Dict[str, bigquery.SchemaField] = {}
+    for schema in schemas:
+        for field in schema:
+            existing = merged.get(field.name)
+            merged[field.name] = (
+                field if existing is None else _merge_field(existing, field, prefix + field.name)
+            )
+    return list(merged.values())
+
+
+def _stamp_expiry(table: bigquery.Table) -> bigquery.Table:
+    table.expires = datetime.now(timezone.utc) + timedelta(hours=STAGING_TABLE_EXPIRATION_HOURS)
+    return table
+
+
+def _load_shard(
+    client: bigquery.Client,
+    stage_ref: str,
+    file_path: str,
+    offset: int,
+    length: int,
+    schema=None,
+    max_retries: int = SHARD_MAX_RETRIES,
+) -> None:
+    """Upload one byte range into its own staging table, retrying only this shard.
+
+    The staging table gets an expiration so it disappears even if this process
+    is killed before load_sharded_jsonl_file can delete it.
+    """
+    # WRITE_TRUNCATE keeps retries idempotent
+    job_config = _load_job_config("WRITE_TRUNCATE", schema)
+    client.create_table(_stamp_expiry(bigquery.Table(stage_ref)), exists_ok=True)
+    for attempt in range(1, max_retries + 1):
+        try:
+            with open(file_path, "rb") as f:
+                f.seek(offset)
+                load_job = client.load_table_from_file(
+                    f, stage_ref, job_config=job_config, rewind=False, size=length
+                )
+            load_job.result()
+            # Re-assert the expiration in case the load replaced the table metadata
+            client.update_table(_stamp_expiry(client.get_table(stage_ref)), ["expires"])
+            return
+        except Exception as exc:
+            if attempt == max_retries:
+                raise
+            print(f"Shard {stage_ref} failed (attempt {attempt}/{max_retries}): {exc}; retrying")
+            time.sleep(2 ** attempt)
+
+
+def load_sharded_jsonl_file(
+    client: bigquery.Client,
+    table_ref: str,
+    file_path: str,
+    write_disposition: str,
+    shard_size: int = SHARD_SIZE_BYTES,
+    max_workers: int = SHARD_UPLOAD_WORKERS,
+) -> int:
+    """Upload a large file as parallel shards and commit them with one copy job.
+
+    Each shard is loaded into its own staging table. Shards whose autodetected
+    schema differs from the union of all shard schemas are reloaded with the
+    union schema. A single multi-source copy job then writes every staging table
+    to ``table_ref``, so the destination changes atomically. Staging tables are
+    always deleted. Returns the number of rows committed.
+    """
+    ranges = shard_ranges(file_path, shard_size)
+    run_id = uuid.uuid4().hex[:8]
+    stage_refs = [f"{table_ref}__stage_{run_id}_{i:04d}" for i in range(len(ranges))]
+    print(f"Uploading {len(ranges)} shards with {max_workers} workers")
+
+    def load_all(shards, schema=None) -> None:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = [
+                pool.submit(_load_shard, client, stage_refs[i], file_path, offset, length, schema)
+                for i, (offset, length) in shards
+            ]
+            for future in futures:
+                future.result()
+
+    try:
+        load_all(list(enumerate(ranges)))
+
+        stage_tables = [client.get_table(ref) for ref in stage_refs]
+        schema = merge_schemas(t.schema for t in stage_tables)
+        mismatched = [i for i, t in enumerate(stage_tables) if list(t.schema) != schema]
+        if mismatched:
+            print(f"Reloading {len(mismatched)} shard(s) with the merged schema")
+            load_all([(i, ranges[i]) for i in mismatched], schema)
+            stage_tables = [client.get_table(ref) for ref in stage_refs]
+
+        copy_config = bigquery.CopyJobConfig()
+        copy_config.write_disposition = write_disposition
+        client.copy_table(stage_refs, table_ref, job_config=copy_config).result()
+        return sum(t.num_rows or 0 for t in stage_tables)
+    finally:
+        for ref in stage_refs:
+            client.delete_table(ref, not_found_ok=True)
+
+
 def load_jsonl_file(
     client: bigquery.Client,
     dataset_id: str,
     table_id: str,
     file_path: str,
     write_disposition: str,
+    shard_size: int = SHARD_SIZE_BYTES,
+    max_workers: int = SHARD_UPLOAD_WORKERS,
 ) -> None:
     table_ref = f"{client.project}.{dataset_id}.{table_id}"
-    job_config = bigquery.LoadJobConfig()
-    job_config.source_format = bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
-    job_config.autodetect = True
-    job_config.write_disposition = write_disposition
 
-    with open(file_path, "rb") as f:
-        load_job = client.load_table_from_file(f, table_ref, job_config=job_config)
-    result = load_job.result()  # Waits for job to complete
+    if os.path.getsize(file_path) > shard_size:
+        output_rows = load_sharded_jsonl_file(
+            client, table_ref, file_path, write_disposition, shard_size, max_workers
+        )
+    else:
+        job_config = _load_job_config(write_disposition)
+        with open(file_path, "rb") as f:
+            load_job = client.load_table_from_file(f, table_ref, job_config=job_config)
+        output_rows = load_job.result().output_rows  # Waits for job to complete
 
     table = client.get_table(table_ref)
-    print(f"Loaded {result.output_rows} rows into {table.project}:{table.dataset_id}.{table.table_id}")
+    print(f"Loaded {output_rows} rows into {table.project}:{table.dataset_id}.{table.table_id}")
 
 
 def main() -> None:
@@ -110,7 +317,7 @@ def main() -> None:
 
     failures = 0
     for path in files:
-        table_name = sanitize_table_name(path)
+        table_name = table_name_for_path(path)
         print("\n==== Loading ====")
         print(f"File: {path}")
         print(f"Table: {table_name}")
@@ -1,4 +1,5 @@
 import os
+import re
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -16,6 +17,7 @@ SHOPIFY_API_ENDPOINT = os.getenv('SHOPIFY_API_ENDPOINT', 'admin/api')
 DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
+RETRY_BACKOFF_SECONDS = float(os.getenv('RETRY_BACKOFF_SECONDS', '30'))
 
 # Construct the full API URL
 SHOPIFY_API_URL = f"https://{SHOPIFY_STORE}/{SHOPIFY_API_ENDPOINT}/{SHOPIFY_API_VERSION}/graphql.json"
@@ -24,4 +26,49 @@ SHOPIFY_API_URL = f"https://{SHOPIFY_STORE}/{SHOPIFY_API_ENDPOINT}/{SHOPIFY_API_
 SHOPIFY_HEADERS = {
     "Content-Type": "application/json",
     "X-Shopify-Access-Token": SHOPIFY_ACCESS_TOKEN,
-} 
\ No newline at end of file
+}
+
+# Multi-store configuration: comma-separated "store=token" pairs, e.g.
+#   SHOPIFY_STORES=shop-a.myshopify.com=shpat_aaa,shop-b.myshopify.com=shpat_bbb
+# Falls back to the single SHOPIFY_STORE / SHOPIFY_ACCESS_TOKEN pair when unset.
+SHOPIFY_STORES_SPEC = os.getenv('SHOPIFY_STORES', '')
+
+# Per-store limits. Admin API 2024-07 allows one bulk query per shop at a time.
+SHOPIFY_REQUESTS_PER_SECOND = float(os.getenv('SHOPIFY_REQUESTS_PER_SECOND', '2'))
+SHOPIFY_BULK_CONCURRENCY = int(os.getenv('SHOPIFY_BULK_CONCURRENCY', '1'))
+MAX_STORE_WORKERS = int(os.getenv('MAX_STORE_WORKERS', '8'))
+
+
+def build_api_url(store: str) -> str:
+    """Build the GraphQL Admin API URL for a store."""
+    return f"https://{store}/{SHOPIFY_API_ENDPOINT}/{SHOPIFY_API_VERSION}/graphql.json"
+
+
+def build_headers(access_token: str) -> dict:
+    """Build the request headers for a store's access token."""
+    return {
+        "Content-Type": "application/json",
+        "X-Shopify-Access-Token": access_token,
+    }
+
+
+def store_slug(store: str) -> str:
+    """Short, path- and table-safe name for a store (shop-a.myshopify.com -> shop_a)."""
+    name = store.split('.myshopify.com')[0]
+    return re.sub(r'[^A-Za-z0-9_]', '_', name).lower()
+
+
+def parse_stores(spec: str = SHOPIFY_STORES_SPEC) -> list:
+    """Parse SHOPIFY_STORES into a list of {"store", "access_token"} dicts."""
+    stores = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        store, sep, token = entry.partition('=')
+        if not sep or not store.strip() or not token.strip():
+            raise ValueError(f"Invalid SHOPIFY_STORES entry (expected store=token): {entry!r}")
+        stores.append({"store": store.strip(), "access_token": token.strip()})
+    if not stores:
+        stores.append({"store": SHOPIFY_STORE, "access_token": SHOPIFY_ACCESS_TOKEN})
+    return stores
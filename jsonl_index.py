@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Byte-offset index over bulk JSONL exports for random-access lookups.
+
+One streaming pass over e.g. bulk_data/orders_with_line_items_data.jsonl
+writes a SQLite sidecar (``<file>.idx.sqlite``) that maps every line's ``id``
+and ``__parentId`` to its byte offset and length, plus line and byte counts
+per entity type. Lookups then read only the matching lines through mmap, so
+fetching a record, its children or an entity-type slice costs O(result)
+instead of a full parse.
+"""
+
+import json
+import mmap
+import os
+import random
+import re
+import sqlite3
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+INDEX_SUFFIX = ".idx.sqlite"
+INDEX_VERSION = "2"
+BATCH_SIZE = 10000
+# Stay well below SQLite's limit on bound parameters per statement
+MAX_SQL_PARAMS = 500
+
+ENTITY_TYPE_RE = re.compile(r"gid://shopify/([^/]+)/")
+
+
+def entity_type_of(gid: Optional[str]) -> Optional[str]:
+    """Extract the entity type (e.g. "LineItem") from a Shopify GID."""
+    if not gid:
+        return None
+    match = ENTITY_TYPE_RE.match(gid)
+    return match.group(1) if match else None
+
+
+def index_path_for(file_path: str) -> str:
+    return f"{file_path}{INDEX_SUFFIX}"
+
+
+def _source_signature(file_path: str) -> Dict[str, str]:
+    stat = os.stat(file_path)
+    return {
+        "version": INDEX_VERSION,
+        "source_size": str(stat.st_size),
+        "source_mtime_ns": str(stat.st_mtime_ns),
+    }
+
+
+def build_index(file_path: str, index_path: Optional[str] = None) -> str:
+    """Index a JSONL file in one streaming pass; returns the sidecar path.
+
+    The sidecar is written to a temporary file and moved into place at the end,
+    so readers never see a half-built index.
+    """
+    index_path = index_path or index_path_for(file_path)
+    tmp_path = f"{index_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    signature = _source_signature(file_path)
+    con = sqlite3.connect(tmp_path)
+    try:
+        con.execute("PRAGMA journal_mode = OFF")
+        con.execute("PRAGMA synchronous = OFF")
+        con.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.execute(
+            "CREATE TABLE records ("
+            "line INTEGER PRIMARY KEY, id TEXT, entity_type TEXT, parent_id TEXT, "
+            "offset INTEGER NOT NULL, length INTEGER NOT NULL, "
+            "seq INTEGER NOT NULL, entity_seq INTEGER NOT NULL)"
+        )
+
+        # seq / entity_seq number the records 0..n-1 overall and per entity type,
+        # so sample() can draw ordinals without scanning
+        batch: List[Tuple] = []
+        offset = 0
+        seq = 0
+        entity_seqs: Dict[Optional[str], int] = {}
+        with open(file_path, "rb") as f:
+            for line_num, line in enumerate(f, 1):
+                length = len(line)
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        print(f"Error parsing line {line_num}: {e}")
+                        record = None
+                    if isinstance(record, dict):
+                        record_id = record.get("id")
+                        entity_type = entity_type_of(record_id)
+                        entity_seq = entity_seqs.get(entity_type, 0)
+                        entity_seqs[entity_type] = entity_seq + 1
+                        batch.append((
+                            line_num,
+                            record_id,
+                            entity_type,
+                            record.get("__parentId"),
+                            offset,
+                            length,
+                            seq,
+                            entity_seq,
+                        ))
+                        seq += 1
+                        if len(batch) >= BATCH_SIZE:
+                            con.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                            batch = []
+                offset += length
+        if batch:
+            con.executemany("INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+
+        # Building the indexes after the bulk insert is much faster than maintaining them
+        con.execute("CREATE INDEX records_id ON records (id)")
+        con.execute("CREATE INDEX records_parent ON records (parent_id, line)")
+        con.execute("CREATE UNIQUE INDEX records_seq ON records (seq)")
+        con.execute("CREATE UNIQUE INDEX records_entity ON records (entity_type, entity_seq)")
+        con.execute(
+            "CREATE TABLE entity_types AS "
+            "SELECT entity_type, COUNT(*) AS lines, SUM(length) AS bytes "
+            "FROM records GROUP BY entity_type"
+        )
+        con.executemany("INSERT INTO meta VALUES (?, ?)", signature.items())
+        con.commit()
+    finally:
+        con.close()
+
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def index_is_current(file_path: str, index_path: Optional[str] = None) -> bool:
+    """True if the sidecar exists and was built from the file as it is now."""
+    index_path = index_path or index_path_for(file_path)
+    if not os.path.exists(index_path):
+        return False
+    con = sqlite3.connect(index_path)
+    try:
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        con.close()
+    return meta == _source_signature(file_path)
+
+
+class JsonlIndex:
+    """Random access to a bulk JSONL file through its byte-offset sidecar.
+
+    The sidecar is (re)built automatically when missing or stale. Use as a
+    context manager, or call close() when done.
+    """
+
+    def __init__(self, file_path: str, index_path: Optional[str] = None, rebuild: bool = False):
+        self.file_path = file_path
+        self.index_path = index_path or index_path_for(file_path)
+        if rebuild or not index_is_current(file_path, self.index_path):
+            build_index(file_path, self.index_path)
+
+        self._con = sqlite3.connect(self.index_path)
+        self._file = open(file_path, "rb")
+        # mmap cannot map an empty file
+        self._mm = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if os.path.getsize(file_path)
+            else None
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+        self._con.close()
+
+    def _read(self, offset: int, length: int) -> bytes:
+        return self._mm[offset:offset + length]
+
+    def _records(self, rows: Iterable[Tuple[int, int]]) -> Iterator[dict]:
+        for offset, length in rows:
+            yield json.loads(self._read(offset, length))
+
+    def entity_counts(self) -> Dict[Optional[str], Tuple[int, int]]:
+        """Map each entity type to its (line count, byte count)."""
+        return {
+            entity_type: (lines, size)
+            for entity_type, lines, size in self._con.execute(
+                "SELECT entity_type, lines, bytes FROM entity_types ORDER BY entity_type"
+            )
+        }
+
+    def get(self, record_id: str) -> Optional[dict]:
+        """Fetch the record with the given ``id``, or None."""
+        row = self._con.execute(
+            "SELECT offset, length FROM records WHERE id = ? LIMIT 1", (record_id,)
+        ).fetchone()
+        return json.loads(self._read(*row)) if row else None
+
+    def children(self, parent_id: str, entity_type: Optional[str] = None) -> Iterator[dict]:
+        """Yield the records whose ``__parentId`` is ``parent_id``, in file order."""
+        if entity_type is None:
+            rows = self._con.execute(
+                "SELECT offset, length FROM records WHERE parent_id = ? ORDER BY line",
+                (parent_id,),
+            )
+        else:
+            rows = self._con.execute(
+                "SELECT offset, length FROM records WHERE parent_id = ? AND entity_type = ? ORDER BY line",
+                (parent_id, entity_type),
+            )
+        return self._records(rows)
+
+    def iter_entity(self, entity_type: str, limit: Optional[int] = None) -> Iterator[dict]:
+        """Yield the records of one entity type in file order."""
+        sql = "SELECT offset, length FROM records WHERE entity_type = ? ORDER BY entity_seq"
+        params: Tuple = (entity_type,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return self._records(self._con.execute(sql, params))
+
+    def sample(self, n: int, entity_type: Optional[str] = None, seed: Optional[int] = None) -> List[dict]:
+        """Return ``n`` records drawn uniformly at random, in file order.
+
+        Random ordinals are drawn in Python and resolved through the sequence
+        indexes, so the cost is O(n) regardless of the file size.
+        """
+        if entity_type is None:
+            row = self._con.execute("SELECT COALESCE(SUM(lines), 0) FROM entity_types").fetchone()
+            where, params = "seq IN ({})", ()
+        else:
+            row = self._con.execute(
+                "SELECT lines FROM entity_types WHERE entity_type = ?", (entity_type,)
+            ).fetchone()
+            where, params = "entity_type = ? AND entity_seq IN ({})", (entity_type,)
+        total = row[0] if row else 0
+
+        chosen = random.Random(seed).sample(range(total), min(n, total))
+        rows: List[Tuple[int, int, int]] = []
+        for start in range(0, len(chosen), MAX_SQL_PARAMS):
+            ordinals = chosen[start:start + MAX_SQL_PARAMS]
+            placeholders = ", ".join("?" * len(ordinals))
+            rows.extend(self._con.execute(
+                f"SELECT line, offset, length FROM records WHERE {where.format(placeholders)}",
+                params + tuple(ordinals),
+            ))
+        rows.sort()
+        return list(self._records((offset, length) for _, offset, length in rows))
+
+    def write_subset(self, record_ids: Iterable[str], output_path: str, include_children: bool = True) -> int:
+        """Copy the raw lines of ``record_ids`` (and their children) to a new JSONL file.
+
+        The result can be fed to the usual parsing and export steps to reprocess
+        only part of a large export. Returns the number of lines written.
+        """
+        written = 0
+        with open(output_path, "wb") as out:
+            for record_id in record_ids:
+                if include_children:
+                    rows = self._con.execute(
+                        "SELECT offset, length FROM records WHERE id = ? OR parent_id = ? ORDER BY line",
+                        (record_id, record_id),
+                    )
+                else:
+                    rows = self._con.execute(
+                        "SELECT offset, length FROM records WHERE id = ?", (record_id,)
+                    )
+                for offset, length in rows:
+                    data = self._read(offset, length)
+                    out.write(data if data.endswith(b"\n") else data + b"\n")
+                    written += 1
+        return written
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python jsonl_index.py <file.jsonl> [record id]")
+        return
+
+    jsonl_file = sys.argv[1]
+    if not os.path.exists(jsonl_file):
+        print(f"Error: {jsonl_file} not found!")
+        return
+
+    with JsonlIndex(jsonl_file) as index:
+        print(f"Index: {index.index_path}")
+        print("\nLines and bytes by entity type:")
+        for entity_type, (lines, size) in index.entity_counts().items():
+            print(f"  {entity_type or '(none)'}: {lines} lines, {size} bytes")
+
+        if len(sys.argv) > 2:
+            record_id = sys.argv[2]
+            record = index.get(record_id)
+            if record is None:
+                print(f"\nNo record with id {record_id}")
+                return
+            print("\n" + "=" * 80)
+            print(json.dumps(record, indent=2))
+            for child in index.children(record_id):
+                print(json.dumps(child))
+
+
+if __name__ == "__main__":
+    main()
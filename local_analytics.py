@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Query the bulk_data exports in place with an embedded DuckDB engine.
+
+Every ``bulk_data/*_data.jsonl`` file (or a derived ``*_data.parquet`` file
+next to it) is registered as a view, together with one view per Shopify
+entity type and a ``__children`` view that resolves ``__parentId`` links.
+Nothing is loaded into memory up front: DuckDB scans the files lazily with
+projection pushdown and multiple threads, and no cloud access is needed.
+"""
+
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Set
+
+import duckdb
+from dotenv import load_dotenv
+
+# Load .env if present
+load_dotenv()
+
+# Configuration from environment variables
+BULK_DATA_DIR = os.getenv("BULK_DATA_DIR", "bulk_data")
+DUCKDB_DATABASE = os.getenv("DUCKDB_DATABASE", ":memory:")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", str(os.cpu_count() or 1)))
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "")  # e.g. "4GB"; empty keeps DuckDB's default
+DUCKDB_JSON_SAMPLE_SIZE = int(os.getenv("DUCKDB_JSON_SAMPLE_SIZE", "20480"))  # -1 scans the whole file for the schema
+
+ENTITY_TYPE_SQL = r"regexp_extract(id, 'gid://shopify/([^/]+)/', 1)"
+
+
+def sanitize_view_name(name: str) -> str:
+    """Convert a file stem or entity type to a valid, unquoted SQL identifier."""
+    # CamelCase entity types (e.g. LineItem) become snake_case (line_item)
+    name = re.sub(r"(?<=[a-z0-9])(?=[A-Z])", "_", name).lower()
+    name = re.sub(r"[^a-z0-9_]", "_", name)
+    if not re.match(r"^[a-z_]", name):
+        name = f"_{name}"
+    return name
+
+
+def discover_sources(data_dir: str = BULK_DATA_DIR) -> Dict[str, str]:
+    """Map view names to data files, preferring a columnar copy over the JSONL original."""
+    sources: Dict[str, str] = {}
+    if not os.path.isdir(data_dir):
+        return sources
+
+    for entry in sorted(os.listdir(data_dir)):
+        stem, ext = os.path.splitext(entry)
+        if ext not in (".jsonl", ".parquet") or not stem.endswith("_data"):
+            continue
+        view_name = sanitize_view_name(re.sub(r"_data$", "", stem))
+        path = os.path.join(data_dir, entry)
+        current = sources.get(view_name)
+        if current is None:
+            sources[view_name] = path
+            continue
+        # Use the parquet file only when it is at least as fresh as the JSONL export
+        parquet, jsonl = (path, current) if ext == ".parquet" else (current, path)
+        sources[view_name] = parquet if os.path.getmtime(parquet) >= os.path.getmtime(jsonl) else jsonl
+    return sources
+
+
+def connect(database: str = DUCKDB_DATABASE) -> duckdb.DuckDBPyConnection:
+    """Open a DuckDB connection configured for multi-threaded local scans."""
+    con = duckdb.connect(database)
+    con.execute(f"SET threads = {DUCKDB_THREADS}")
+    if DUCKDB_MEMORY_LIMIT:
+        con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}'")
+    # Row order is irrelevant for ad-hoc modeling; this lets DuckDB parallelize freely
+    con.execute("SET preserve_insertion_order = false")
+    return con
+
+
+def _scan_expression(path: str) -> str:
+    """Build the table function call that scans a data file lazily."""
+    quoted = path.replace("'", "''")
+    if path.endswith(".parquet"):
+        return f"read_parquet('{quoted}')"
+    return (
+        f"read_json('{quoted}', format = 'newline_delimited', "
+        f"sample_size = {DUCKDB_JSON_SAMPLE_SIZE})"
+    )
+
+
+def _sampled_keys(con: duckdb.DuckDBPyConnection, path: str) -> Dict[str, Set[str]]:
+    """Map each entity type to the JSON keys its records carry, from a sample of the file.
+
+    Only the first DUCKDB_JSON_SAMPLE_SIZE lines are read (the same rows
+    read_json samples for the schema), and keys count as present even when
+    their value is null.
+    """
+    quoted = path.replace("'", "''")
+    limit = f" LIMIT {DUCKDB_JSON_SAMPLE_SIZE}" if DUCKDB_JSON_SAMPLE_SIZE >= 0 else ""
+    rows = con.execute(
+        f"SELECT regexp_extract(json ->> '$.id', 'gid://shopify/([^/]+)/', 1) AS entityType, "
+        f"list_distinct(flatten(list(json_keys(json)))) "
+        f"FROM (SELECT json FROM read_ndjson_objects('{quoted}'){limit}) "
+        f"GROUP BY entityType"
+    ).fetchall()
+    return {entity_type: set(keys) for entity_type, keys in rows if entity_type}
+
+
+def register_source(
+    con: duckdb.DuckDBPyConnection,
+    view_name: str,
+    path: str,
+    entity_types: Optional[List[str]] = None,
+) -> List[str]:
+    """Register a data file as a view plus its entity-type and parent helper views.
+
+    A bulk export mixes entity types in one file, so the file view carries the
+    union of their columns. Each entity-type view keeps the columns whose keys
+    that type's records carry in the sampled lines, including keys that are
+    always null; types without key information (parquet sources, or types
+    named in ``entity_types`` but absent from the sample) keep every column.
+    ``entity_types`` limits which views are made. Returns the names of the
+    views created.
+    """
+    con.execute(
+        f"CREATE OR REPLACE VIEW {view_name} AS "
+        f"SELECT *, {ENTITY_TYPE_SQL} AS entityType FROM {_scan_expression(path)}"
+    )
+    created = [view_name]
+
+    columns = [row[0] for row in con.execute(f"DESCRIBE {view_name}").fetchall()]
+    if "id" not in columns:
+        return created
+
+    data_columns = [c for c in columns if c != "entityType"]
+    if path.endswith(".parquet"):
+        # Parquet does not record which keys a record had; reading only the id
+        # column for the distinct types is cheap
+        present = {
+            row[0]: set(data_columns)
+            for row in con.execute(
+                f"SELECT DISTINCT entityType FROM {view_name} WHERE entityType <> ''"
+            ).fetchall()
+        }
+    else:
+        present = _sampled_keys(con, path)
+
+    for entity_type in entity_types if entity_types is not None else sorted(present):
+        keys = present.get(entity_type, set(data_columns))
+        entity_columns = [c for c in data_columns if c in keys]
+        entity_view = f"{view_name}__{sanitize_view_name(entity_type)}"
+        escaped = entity_type.replace("'", "''")
+        select_list = ", ".join(f'"{c}"' for c in entity_columns)
+        con.execute(
+            f"CREATE OR REPLACE VIEW {entity_view} AS "
+            f"SELECT {select_list}, entityType FROM {view_name} WHERE entityType = '{escaped}'"
+        )
+        created.append(entity_view)
+
+    if "__parentId" in columns:
+        children_view = f"{view_name}__children"
+        con.execute(
+            f"CREATE OR REPLACE VIEW {children_view} AS "
+            f"SELECT regexp_extract(__parentId, 'gid://shopify/([^/]+)/', 1) AS parentType, * "
+            f"FROM {view_name} WHERE __parentId IS NOT NULL"
+        )
+        created.append(children_view)
+
+    return created
+
+
+def register_all(
+    con: duckdb.DuckDBPyConnection, data_dir: str = BULK_DATA_DIR
+) -> Dict[str, List[str]]:
+    """Register every export found in ``data_dir``; returns views created per source."""
+    registered: Dict[str, List[str]] = {}
+    for view_name, path in discover_sources(data_dir).items():
+        registered[view_name] = register_source(con, view_name, path)
+    return registered
+
+
+def export_parquet(con: duckdb.DuckDBPyConnection, view_name: str, data_dir: str = BULK_DATA_DIR) -> str:
+    """Write a registered source to ``<view>_data.parquet`` so later scans are columnar."""
+    path = os.path.join(data_dir, f"{view_name}_data.parquet")
+    quoted = path.replace("'", "''")
+    # Exclude the derived column; it is recomputed when the parquet file is registered
+    con.execute(
+        f"COPY (SELECT * EXCLUDE (entityType) FROM {view_name}) "
+        f"TO '{quoted}' (FORMAT PARQUET, COMPRESSION ZSTD)"
+    )
+    return path
+
+
+def orders_with_line_items_for_customer(
+    con: duckdb.DuckDBPyConnection,
+    customer_id: str,
+    source: str = "orders_with_line_items",
+) -> duckdb.DuckDBPyRelation:
+    """Return one row per line item of every order placed by ``customer_id``.
+
+    The result is a lazy relation; call ``.df()``, ``.arrow()`` or
+    ``.fetchall()`` on it to materialize only the matching rows.
+    """
+    return con.sql(
+        f"""
+        SELECT
+            o.id AS orderId,
+            o.name AS orderName,
+            o.createdAt,
+            o.currencyCode,
+            li.* EXCLUDE (entityType, __parentId)
+        FROM {source}__order AS o
+        JOIN {source}__line_item AS li ON li.__parentId = o.id
+        WHERE o.customer.id::VARCHAR = $customer_id
+        ORDER BY o.createdAt, o.id
+        """,
+        params={"customer_id": customer_id},
+    )
+
+
+def main() -> None:
+    sources = discover_sources()
+    if not sources:
+        print(f"No *_data.jsonl or *_data.parquet files found in '{BULK_DATA_DIR}'.")
+        sys.exit(0)
+
+    con = connect()
+    print(f"DuckDB threads: {DUCKDB_THREADS}")
+    print("Registered views:")
+    for view_name, path in sources.items():
+        views = register_source(con, view_name, path)
+        print(f" - {path}")
+        for view in views:
+            print(f"     {view}")
+
+    # Run an ad-hoc query passed on the command line, e.g.
+    #   python local_analytics.py "SELECT entityType, count(*) FROM orders_with_line_items GROUP BY 1"
+    if len(sys.argv) > 1:
+        sql = " ".join(sys.argv[1:])
+        print("\n" + "=" * 80)
+        print(sql)
+        print("=" * 80)
+        con.sql(sql).show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import asyncio
+import contextlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    MAX_STORE_WORKERS,
+    SHOPIFY_BULK_CONCURRENCY,
+    SHOPIFY_REQUESTS_PER_SECOND,
+    build_api_url,
+    build_headers,
+    parse_stores,
+    store_slug,
+)
+from async_bulk_client import AsyncBulkClient, run_bulk_operations
+from queries import QUERIES
+
+OUTPUT_ROOT = "bulk_data"
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls out to at most ``rate`` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = time.monotonic()
+
+    def _reserve(self) -> float:
+        """Claim the next free slot; returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        return wait
+
+    def acquire(self) -> None:
+        """Block until the caller may issue its next request."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Like acquire(), but sleeps without blocking the event loop."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def run_store(store: dict, query_keys: List[str], output_root: str = OUTPUT_ROOT) -> dict:
+    """Run the selected bulk operations for one store; executed in its own process.
+
+    One AsyncBulkClient drives all of the store's operations on a single event
+    loop, at most SHOPIFY_BULK_CONCURRENCY at a time, and every request goes
+    through one shared rate limiter. The store's limits therefore hold however
+    many stores run at once. Detailed progress goes to
+    ``<output_root>/<store>/pipeline.log``.
+    """
+    slug = store_slug(store["store"])
+    output_dir = os.path.join(output_root, slug)
+    os.makedirs(output_dir, exist_ok=True)
+
+    api_url = build_api_url(store["store"])
+    headers = build_headers(store["access_token"])
+    rate_limiter = RateLimiter(SHOPIFY_REQUESTS_PER_SECOND)
+    queries = {key: QUERIES[key] for key in query_keys}
+
+    async def run() -> Dict[str, Optional[Tuple[int, int]]]:
+        async with AsyncBulkClient(api_url, headers, rate_limiter) as client:
+            return await run_bulk_operations(
+                client, queries, output_dir, concurrency=SHOPIFY_BULK_CONCURRENCY
+            )
+
+    summary = {
+        "store": store["store"],
+        "slug": slug,
+        "successful": 0,
+        "failed": 0,
+        "lines": 0,
+        "bytes": 0,
+    }
+    started = time.monotonic()
+
+    log_path = os.path.join(output_dir, "pipeline.log")
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+        results = asyncio.run(run())
+
+    # Line and byte counts come from the download itself, so no file is read again
+    for counts in results.values():
+        if counts is None:
+            summary["failed"] += 1
+            continue
+        summary["successful"] += 1
+        lines, size = counts
+        summary["lines"] += lines
+        summary["bytes"] += size
+
+    summary["elapsed"] = time.monotonic() - started
+    return summary
+
+
+def run_stores(stores: List[dict], query_keys: List[str], output_root: str = OUTPUT_ROOT) -> List[dict]:
+    """Fan the selected queries out over all stores, one worker process per store."""
+    summaries = []
+    max_workers = max(1, min(MAX_STORE_WORKERS, len(stores)))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(run_store, store, query_keys, output_root): store
+            for store in stores
+        }
+        for future in as_completed(futures):
+            store = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. bad output dir); count every query as failed
+                print(f"Exception occurred while running store {store['store']}: {e}")
+                summary = {
+                    "store": store["store"],
+                    "slug": store_slug(store["store"]),
+                    "successful": 0,
+                    "failed": len(query_keys),
+                    "lines": 0,
+                    "bytes": 0,
+                    "elapsed": 0.0,
+                }
+            print(
+                f"[{summary['slug']}] {summary['successful']} ok, {summary['failed']} failed, "
+                f"{summary['lines']} lines, {summary['bytes']} bytes in {summary['elapsed']:.1f}s"
+            )
+            summaries.append(summary)
+    return summaries
+
+
+def main():
+    """Run bulk operations for every configured store."""
+    stores = parse_stores()
+
+    print("Shopify Multi-Store Bulk Data Extraction")
+    print("=" * 60)
+    print(f"Stores: {len(stores)}")
+    for store in stores:
+        print(f" - {store['store']} -> {OUTPUT_ROOT}/{store_slug(store['store'])}/")
+    print(f"Store workers: {min(MAX_STORE_WORKERS, len(stores))}")
+    print(f"Per-store limits: {SHOPIFY_REQUESTS_PER_SECOND} req/s, {SHOPIFY_BULK_CONCURRENCY} concurrent bulk operation(s)")
+
+    print("\nAvailable queries:")
+    for i, (key, info) in enumerate(QUERIES.items(), 1):
+        print(f"{i}. {key}: {info['name']}")
+
+    print("\nEnter query keys separated by commas (leave empty to run all):")
+    keys_input = input().strip()
+    if keys_input:
+        query_keys = [key.strip() for key in keys_input.split(",") if key.strip() in QUERIES]
+    else:
+        query_keys = list(QUERIES)
+    if not query_keys:
+        print("No valid query keys selected!")
+        return
+
+    print(f"\nRunning {len(query_keys)} queries on {len(stores)} stores...\n")
+    started = time.monotonic()
+    summaries = run_stores(stores, query_keys)
+    elapsed = time.monotonic() - started
+
+    successful = sum(s["successful"] for s in summaries)
+    failed = sum(s["failed"] for s in summaries)
+    total_lines = sum(s["lines"] for s in summaries)
+    total_bytes = sum(s["bytes"] for s in summaries)
+
+    print(f"\n{'='*60}")
+    print("Multi-store bulk operations completed!")
+    print(f"Successful: {successful}")
+    print(f"Failed: {failed}")
+    print(f"Wall time: {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"Throughput: {total_lines / elapsed:.1f} lines/s, {total_bytes / elapsed / 1_000_000:.2f} MB/s")
+    print(f"Results saved in '{OUTPUT_ROOT}/<store>/' directories")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ QUERIES = {
     "orders_with_line_items": {
         "name": "Orders with Line Items",
         "description": "Complete order data including line items, customer info, and addresses",
+        # Date field sharded_pipeline.py may split this query on
+        "shard_field": "created_at",
         "query": """
 {
   orders {
@@ -62,6 +64,7 @@ QUERIES = {
               sku
               quantity
               originalUnitPriceSet { shopMoney { amount currencyCode } }
+              product { id }
             }
           }
         }
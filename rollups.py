@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained sales rollups from orders and line items.
+
+Daily sales are aggregated by day, product, location and customer into a small
+SQLite store (``bulk_data/rollups.sqlite``). The store also keeps each order's
+last contribution. When a new or changed order arrives, its old contribution is
+retracted and the new one inserted, so a refresh only touches the orders in the
+incoming file instead of rescanning all history. ``export_rollups`` writes
+``bulk_data/rollup_sales_by_<dimension>_data.jsonl`` files, which
+bigquery_export.py and local_analytics.py pick up with the other outputs.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from jsonl_index import JsonlIndex
+
+# Load .env if present
+load_dotenv()
+
+ROLLUP_DB = os.getenv("ROLLUP_DB", os.path.join("bulk_data", "rollups.sqlite"))
+ROLLUP_OUTPUT_DIR = os.getenv("ROLLUP_OUTPUT_DIR", "bulk_data")
+
+DIMENSIONS = ("day", "product", "location", "customer")
+
+# Money is stored as integers in 1/10000 of the currency unit so that
+# retractions cancel insertions exactly (covers 3-decimal currencies too)
+AMOUNT_SCALE = 10000
+
+# (dimension, day, key, currency, orders, quantity, gross_sales, total_sales)
+Contribution = Tuple[str, str, str, str, int, int, int, int]
+
+
+def to_units(amount) -> int:
+    """Convert a Shopify money amount (string) to scaled integer units."""
+    if amount in (None, ""):
+        return 0
+    return int((Decimal(str(amount)) * AMOUNT_SCALE).to_integral_value())
+
+
+def _money(money_set: Optional[dict]) -> Tuple[int, Optional[str]]:
+    shop_money = (money_set or {}).get("shopMoney") or {}
+    return to_units(shop_money.get("amount")), shop_money.get("currencyCode")
+
+
+def product_key(line_item: dict) -> str:
+    """Best available product identifier for a line item."""
+    product = line_item.get("product") or {}
+    variant = line_item.get("variant") or {}
+    return (
+        product.get("id")
+        or (variant.get("product") or {}).get("id")
+        or line_item.get("sku")
+        or variant.get("sku")
+        or line_item.get("title")
+        or "Unknown"
+    )
+
+
+def location_key(order: dict) -> str:
+    """Ship-to country/province of an order."""
+    address = order.get("shippingAddress") or order.get("billingAddress") or {}
+    country = address.get("country") or "Unknown"
+    province = address.get("province")
+    return f"{country}/{province}" if province else country
+
+
+def order_contributions(order: dict, line_items: List[dict]) -> List[Contribution]:
+    """Compute the rollup rows an order adds; cancelled orders add nothing."""
+    if order.get("cancelledAt") or not order.get("createdAt"):
+        return []
+
+    day = order["createdAt"][:10]
+    total, currency = _money(order.get("currentTotalPriceSet") or order.get("totalPriceSet"))
+    currency = currency or order.get("currencyCode") or ""
+
+    quantity = 0
+    gross = 0
+    by_product: Dict[str, List[int]] = {}
+    for line_item in line_items:
+        item_quantity = int(line_item.get("quantity") or 0)
+        unit_price, _ = _money(line_item.get("originalUnitPriceSet"))
+        item_gross = item_quantity * unit_price
+        quantity += item_quantity
+        gross += item_gross
+        product_totals = by_product.setdefault(product_key(line_item), [0, 0])
+        product_totals[0] += item_quantity
+        product_totals[1] += item_gross
+
+    customer = (order.get("customer") or {}).get("id") or "Guest"
+    contributions: List[Contribution] = [
+        ("day", day, "", currency, 1, quantity, gross, total),
+        ("location", day, location_key(order), currency, 1, quantity, gross, total),
+        ("customer", day, customer, currency, 1, quantity, gross, total),
+    ]
+    # Order totals cannot be split across products, so product rows carry gross sales only
+    for key, (item_quantity, item_gross) in by_product.items():
+        contributions.append(("product", day, key, currency, 1, item_quantity, item_gross, 0))
+    return contributions
+
+
+def connect(db_path: str = ROLLUP_DB) -> sqlite3.Connection:
+    """Open (and initialize) the rollup store."""
+    db_dir = os.path.dirname(db_path)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    con = sqlite3.connect(db_path)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS rollups ("
+        "dimension TEXT NOT NULL, day TEXT NOT NULL, key TEXT NOT NULL, currency TEXT NOT NULL, "
+        "orders INTEGER NOT NULL, quantity INTEGER NOT NULL, "
+        "gross_sales INTEGER NOT NULL, total_sales INTEGER NOT NULL, "
+        "PRIMARY KEY (dimension, day, key, currency)) WITHOUT ROWID"
+    )
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS order_state ("
+        "order_id TEXT PRIMARY KEY, updated_at TEXT, contributions TEXT NOT NULL)"
+    )
+    con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return con
+
+
+def _add(con: sqlite3.Connection, contributions: Iterable[Contribution], sign: int) -> None:
+    con.executemany(
+        "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (dimension, day, key, currency) DO UPDATE SET "
+        "orders = orders + excluded.orders, quantity = quantity + excluded.quantity, "
+        "gross_sales = gross_sales + excluded.gross_sales, total_sales = total_sales + excluded.total_sales",
+        [
+            (dimension, day, key, currency, sign * orders, sign * quantity, sign * gross, sign * total)
+            for dimension, day, key, currency, orders, quantity, gross, total in contributions
+        ],
+    )
+
+
+def apply_order(con: sqlite3.Connection, order: dict, line_items: List[dict]) -> bool:
+    """Retract an order's previous contribution and insert its current one.
+
+    Returns False (and changes nothing) when the stored version of the order
+    is at least as recent as ``order``.
+    """
+    order_id = order["id"]
+    updated_at = order.get("updatedAt")
+    previous = con.execute(
+        "SELECT updated_at, contributions FROM order_state WHERE order_id = ?", (order_id,)
+    ).fetchone()
+    if previous is not None:
+        previous_updated_at, previous_contributions = previous
+        if updated_at and previous_updated_at and previous_updated_at >= updated_at:
+            return False
+        _add(con, [tuple(c) for c in json.loads(previous_contributions)], -1)
+
+    contributions = order_contributions(order, line_items)
+    _add(con, contributions, 1)
+    con.execute(
+        "INSERT OR REPLACE INTO order_state VALUES (?, ?, ?)",
+        (order_id, updated_at, json.dumps(contributions, separators=(",", ":"))),
+    )
+    return True
+
+
+def apply_orders_file(con: sqlite3.Connection, file_path: str) -> Tuple[int, int]:
+    """Apply every order in a bulk orders JSONL file; returns (applied, skipped).
+
+    Orders and their line items are read through the byte-offset index, so the
+    file is never loaded whole. All changes commit in one transaction.
+    """
+    applied = 0
+    skipped = 0
+    watermark = get_watermark(con)
+    with JsonlIndex(file_path) as index, con:
+        for order in index.iter_entity("Order"):
+            line_items = list(index.children(order["id"], "LineItem"))
+            if apply_order(con, order, line_items):
+                applied += 1
+            else:
+                skipped += 1
+            updated_at = order.get("updatedAt")
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+
+        # Drop groups whose orders have all been retracted
+        con.execute("DELETE FROM rollups WHERE orders = 0")
+        if watermark:
+            con.execute("INSERT OR REPLACE INTO meta VALUES ('watermark', ?)", (watermark,))
+    return applied, skipped
+
+
+def get_watermark(con: sqlite3.Connection) -> Optional[str]:
+    """Latest order updatedAt applied so far."""
+    row = con.execute("SELECT value FROM meta WHERE key = 'watermark'").fetchone()
+    return row[0] if row else None
+
+
+def _from_units(units: int) -> float:
+    return float(Decimal(units) / AMOUNT_SCALE)
+
+
+def export_rollups(con: sqlite3.Connection, output_dir: str = ROLLUP_OUTPUT_DIR) -> List[str]:
+    """Write one ``rollup_sales_by_<dimension>_data.jsonl`` file per dimension."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for dimension in DIMENSIONS:
+        path = os.path.join(output_dir, f"rollup_sales_by_{dimension}_data.jsonl")
+        with open(f"{path}.part", "w") as f:
+            rows = con.execute(
+                "SELECT day, key, currency, orders, quantity, gross_sales, total_sales "
+                "FROM rollups WHERE dimension = ? ORDER BY day, key, currency",
+                (dimension,),
+            )
+            for day, key, currency, orders, quantity, gross, total in rows:
+                record = {"day": day}
+                if dimension != "day":
+                    record[dimension] = key
+                record.update({
+                    "currencyCode": currency,
+                    "orders": orders,
+                    "quantity": quantity,
+                    "grossSales": _from_units(gross),
+                })
+                if dimension != "product":
+                    record["totalSales"] = _from_units(total)
+                f.write(json.dumps(record) + "\n")
+        os.replace(f"{path}.part", path)
+        paths.append(path)
+    return paths
+
+
+def fetch_updated_orders(con: sqlite3.Connection) -> bool:
+    """Fetch orders updated since the watermark with a bulk operation and apply them."""
+    # Imported here so applying local files does not need the Shopify client
+    from data_pipeline import run_bulk_operation
+    from queries import QUERIES
+    from sharded_pipeline import parse_date, windowed_query
+
+    watermark = get_watermark(con)
+    if watermark is None:
+        print("No watermark yet; apply a full orders export first.")
+        return False
+
+    query_info = QUERIES["orders_with_line_items"]
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    changed_query = {
+        "name": f"{query_info['name']} updated since {watermark}",
+        "description": query_info["description"],
+        # Start at the watermark itself; orders already applied are skipped by updatedAt
+        "query": windowed_query(query_info["query"], "updated_at", parse_date(watermark), now),
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="rollup_updates_")
+    try:
+        if not run_bulk_operation("orders_updated", changed_query, work_dir):
+            return False
+        applied, skipped = apply_orders_file(con, os.path.join(work_dir, "orders_updated_data.jsonl"))
+        print(f"Applied {applied} changed orders ({skipped} already up to date)")
+        return True
+    finally:
+        shutil.rmtree(work_dir)
+
+
+def main():
+    con = connect()
+    print("Sales Rollups")
+    print("=" * 60)
+    print(f"Store: {ROLLUP_DB}")
+    print(f"Watermark: {get_watermark(con) or 'none'}")
+
+    print("\nOptions:")
+    print("1. Apply an orders JSONL file")
+    print("2. Fetch orders updated since the watermark and apply them")
+    print("3. Export only")
+    choice = input("\nEnter your choice (1-3): ").strip()
+
+    if choice == "1":
+        print("\nEnter file path (default bulk_data/orders_with_line_items_data.jsonl):")
+        file_path = input().strip() or os.path.join("bulk_data", "orders_with_line_items_data.jsonl")
+        if not os.path.exists(file_path):
+            print(f"Error: {file_path} not found!")
+            sys.exit(1)
+        applied, skipped = apply_orders_file(con, file_path)
+        print(f"Applied {applied} orders ({skipped} already up to date)")
+    elif choice == "2":
+        if not fetch_updated_orders(con):
+            sys.exit(1)
+    elif choice != "3":
+        print("Invalid choice!")
+        return
+
+    print("\nExported:")
+    for path in export_rollups(con):
+        print(f" - {path}")
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
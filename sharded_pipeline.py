@@ -0,0 +1,289 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from config import (
+    MAX_RETRIES,
+    RETRY_BACKOFF_SECONDS,
+    SHOPIFY_API_URL,
+    SHOPIFY_BULK_CONCURRENCY,
+    SHOPIFY_HEADERS,
+)
+from async_bulk_client import AsyncBulkClient, run_bulk_operations
+from queries import QUERIES
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+PLAN_FILE = "plan.json"
+
+# First connection of a bulk query document, e.g. "{\n  orders {"
+TOP_CONNECTION_RE = re.compile(r"^(\s*\{\s*)(\w+)(\s*\{)")
+
+
+def window_bounds(start: datetime, end: datetime, windows: int) -> List[Tuple[datetime, datetime]]:
+    """Split [start, end) into ``windows`` consecutive, equally long ranges."""
+    if end <= start:
+        raise ValueError("end must be after start")
+    windows = max(1, windows)
+    step = (end - start) / windows
+    bounds = [start + step * i for i in range(windows)] + [end]
+    # Whole seconds keep the search filter exact and the windows contiguous
+    bounds = [b.replace(microsecond=0) for b in bounds]
+    bounds[-1] = end
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def windowed_query(graphql_query: str, shard_field: str, start: datetime, end: datetime) -> str:
+    """Restrict the top-level connection of a bulk query to ``start <= shard_field < end``."""
+    search = (
+        f"{shard_field}:>='{start.strftime(TIMESTAMP_FORMAT)}' "
+        f"AND {shard_field}:<'{end.strftime(TIMESTAMP_FORMAT)}'"
+    )
+    query, count = TOP_CONNECTION_RE.subn(rf'\1\2(query: "{search}")\3', graphql_query, count=1)
+    if not count:
+        raise ValueError("Could not find an argument-free top-level connection to filter")
+    return query
+
+
+def read_plan(shard_dir: str) -> Optional[Tuple[datetime, datetime, int]]:
+    """Return the (start, end, windows) plan saved in ``shard_dir``, or None."""
+    plan_path = os.path.join(shard_dir, PLAN_FILE)
+    if not os.path.exists(plan_path):
+        return None
+    with open(plan_path) as f:
+        plan = json.load(f)
+    return parse_date(plan["start"]), parse_date(plan["end"]), int(plan["windows"])
+
+
+def load_or_save_plan(
+    shard_dir: str, start: datetime, end: datetime, windows: int, resume: bool = False
+) -> Optional[Tuple[datetime, datetime, int]]:
+    """Return the window plan to run, saving the given one if ``shard_dir`` has none.
+
+    A saved plan is reused when it matches the arguments, or in place of them
+    when ``resume`` is set. Otherwise the saved windows belong to a different
+    run, so an error is printed and None is returned.
+    """
+    saved = read_plan(shard_dir)
+    if saved is not None:
+        if saved == (start, end, windows):
+            return saved
+        saved_start, saved_end, saved_windows = saved
+        description = (
+            f"{saved_start.strftime(TIMESTAMP_FORMAT)} .. {saved_end.strftime(TIMESTAMP_FORMAT)} "
+            f"in {saved_windows} windows"
+        )
+        if resume:
+            print(f"Resuming saved window plan: {description}")
+            return saved
+        print(
+            f"Error: {shard_dir} holds an unfinished run for {description}, which does not match "
+            f"{start.strftime(TIMESTAMP_FORMAT)} .. {end.strftime(TIMESTAMP_FORMAT)} in {windows} windows. "
+            f"Resume it, or delete {shard_dir} to start over."
+        )
+        return None
+
+    with open(os.path.join(shard_dir, PLAN_FILE), "w") as f:
+        json.dump({
+            "start": start.strftime(TIMESTAMP_FORMAT),
+            "end": end.strftime(TIMESTAMP_FORMAT),
+            "windows": windows,
+        }, f)
+    return start, end, windows
+
+
+def window_key(query_key: str, start: datetime, end: datetime) -> str:
+    return f"{query_key}__{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}"
+
+
+def merge_window_files(paths: List[str], output_path: str) -> int:
+    """Concatenate window outputs in window order; returns the bytes written.
+
+    Every child line belongs to a parent in the same window, so concatenating
+    whole files keeps each parent's children grouped after it.
+    """
+    part_path = f"{output_path}.part"
+    with open(part_path, "wb") as out:
+        for path in paths:
+            last_byte = b"\n"
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    out.write(chunk)
+                    last_byte = chunk[-1:]
+            # Keep lines separate when a window file lacks a trailing newline
+            if last_byte != b"\n":
+                out.write(b"\n")
+        size = out.tell()
+    os.replace(part_path, output_path)
+    return size
+
+
+async def run_windowed_operations(
+    client: AsyncBulkClient,
+    query_key: str,
+    query_info: dict,
+    start: datetime,
+    end: datetime,
+    windows: int,
+    output_dir: str = "bulk_data",
+    concurrency: int = SHOPIFY_BULK_CONCURRENCY,
+    max_retries: int = MAX_RETRIES,
+    retry_backoff: float = RETRY_BACKOFF_SECONDS,
+    resume: bool = False,
+) -> bool:
+    """Run one query as ``windows`` date-range bulk operations and merge the results.
+
+    Window outputs and the window plan (start, end, windows) are kept under
+    ``<output_dir>/shards/<query_key>/`` until the merge succeeds. A later run
+    with the same arguments, or with ``resume=True`` and any arguments, picks
+    up the saved plan and skips windows that already completed; a run with
+    different arguments fails rather than merging the other run's windows.
+    Each retry round, after a growing backoff, only re-runs the windows that
+    failed.
+    """
+    shard_field = query_info.get("shard_field")
+    if not shard_field:
+        print(f"Query '{query_key}' has no 'shard_field'; it cannot be split into windows.")
+        return False
+
+    shard_dir = os.path.join(output_dir, "shards", query_key)
+    os.makedirs(shard_dir, exist_ok=True)
+    plan = load_or_save_plan(shard_dir, start, end, windows, resume)
+    if plan is None:
+        return False
+    start, end, windows = plan
+
+    window_queries = {}
+    for lo, hi in window_bounds(start, end, windows):
+        window_queries[window_key(query_key, lo, hi)] = {
+            "name": f"{query_info['name']} [{lo.strftime(TIMESTAMP_FORMAT)} .. {hi.strftime(TIMESTAMP_FORMAT)})",
+            "description": query_info["description"],
+            "query": windowed_query(query_info["query"], shard_field, lo, hi),
+        }
+
+    def shard_path(key: str) -> str:
+        return os.path.join(shard_dir, f"{key}_data.jsonl")
+
+    pending = {key: q for key, q in window_queries.items() if not os.path.exists(shard_path(key))}
+    if len(pending) < len(window_queries):
+        print(f"Reusing {len(window_queries) - len(pending)} window(s) from a previous run")
+
+    for attempt in range(1, max_retries + 1):
+        if not pending:
+            break
+        if attempt > 1:
+            # Give cancelled operations time to release the shop's bulk query slot
+            delay = retry_backoff * 2 ** (attempt - 2)
+            print(f"\nWaiting {delay:.0f} seconds before retrying failed windows...")
+            await asyncio.sleep(delay)
+        print(f"\nRound {attempt}/{max_retries}: running {len(pending)} window(s), {concurrency} at a time")
+        results = await run_bulk_operations(client, pending, shard_dir, concurrency)
+        pending = {key: q for key, q in pending.items() if results[key] is None}
+
+    if pending:
+        print(f"\n{len(pending)} window(s) still failing after {max_retries} attempts:")
+        for key in pending:
+            print(f" - {key}")
+        print(f"Completed windows are kept in {shard_dir}; re-run to retry only the failed ones.")
+        return False
+
+    output_path = os.path.join(output_dir, f"{query_key}_data.jsonl")
+    size = merge_window_files([shard_path(key) for key in window_queries], output_path)
+    shutil.rmtree(shard_dir)
+    print(f"\nMerged {len(window_queries)} windows ({size} bytes) into {output_path}")
+    return True
+
+
+def run_sharded_bulk_operation(
+    query_key: str,
+    query_info: dict,
+    start: datetime,
+    end: datetime,
+    windows: int,
+    output_dir: str = "bulk_data",
+    api_url: str = SHOPIFY_API_URL,
+    headers: dict = SHOPIFY_HEADERS,
+    rate_limiter=None,
+    concurrency: int = SHOPIFY_BULK_CONCURRENCY,
+    max_retries: int = MAX_RETRIES,
+    retry_backoff: float = RETRY_BACKOFF_SECONDS,
+    resume: bool = False,
+) -> bool:
+    """Blocking wrapper around run_windowed_operations."""
+    async def run():
+        async with AsyncBulkClient(api_url, headers, rate_limiter) as client:
+            return await run_windowed_operations(
+                client, query_key, query_info, start, end, windows, output_dir,
+                concurrency, max_retries, retry_backoff, resume,
+            )
+
+    return asyncio.run(run())
+
+
+def parse_date(value: str) -> datetime:
+    """Parse YYYY-MM-DD or an ISO timestamp as a UTC datetime."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def main():
+    """Run one shardable query as parallel date-range bulk operations."""
+    shardable = {key: info for key, info in QUERIES.items() if info.get("shard_field")}
+
+    print("Shopify Sharded Bulk Data Extraction")
+    print("=" * 60)
+    print("\nShardable queries:")
+    for i, (key, info) in enumerate(shardable.items(), 1):
+        print(f"{i}. {key}: {info['name']} (by {info['shard_field']})")
+
+    print("\nEnter query key:")
+    key = input().strip()
+    if key not in shardable:
+        print(f"Query '{key}' not found or not shardable!")
+        return
+
+    # An unfinished run for this query can be resumed with its own plan
+    shard_dir = os.path.join("bulk_data", "shards", key)
+    saved = read_plan(shard_dir)
+    resume = False
+    if saved is not None:
+        start, end, windows = saved
+        print(
+            f"\nFound an unfinished run: {start.strftime(TIMESTAMP_FORMAT)} .. "
+            f"{end.strftime(TIMESTAMP_FORMAT)} in {windows} windows"
+        )
+        print("Resume it? (y/n):")
+        resume = input().strip().lower() == "y"
+        if not resume:
+            print("Discard its completed windows and start a new run? (y/n):")
+            if input().strip().lower() != "y":
+                return
+            shutil.rmtree(shard_dir)
+
+    if not resume:
+        try:
+            print("\nStart date (YYYY-MM-DD):")
+            start = parse_date(input().strip())
+            print("End date (YYYY-MM-DD, leave empty for now):")
+            end_input = input().strip()
+            # Pad "now" so orders created while the windows run are still covered
+            end = parse_date(end_input) if end_input else datetime.now(timezone.utc).replace(microsecond=0) + timedelta(minutes=1)
+            print("Number of windows:")
+            windows = int(input().strip())
+        except ValueError as e:
+            print(f"Invalid input: {e}")
+            return
+
+    if run_sharded_bulk_operation(key, shardable[key], start, end, windows, resume=resume):
+        print("Sharded bulk operation completed!")
+    else:
+        print("Sharded bulk operation failed!")
+
+
+if __name__ == "__main__":
+    main()
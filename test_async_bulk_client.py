@@ -0,0 +1,174 @@
+import asyncio
+import json
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+pytest.importorskip("dotenv")
+
+import async_bulk_client  # noqa: E402
+from async_bulk_client import AsyncBulkClient, run_bulk_operation  # noqa: E402
+
+OPERATION_ID = "gid://shopify/BulkOperation/1"
+RESULTS = b'{"id":"gid://shopify/Order/1"}\n{"id":"gid://shopify/LineItem/2","__parentId":"gid://shopify/Order/1"}\n{"id":"gid://shopify/Order/3"}\n'
+THROTTLED = {"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}]}
+QUERY_INFO = {"name": "Orders", "description": "Fake orders", "query": "{ orders { edges { node { id } } } }"}
+
+
+class FakeAdminApi:
+    """Scripted Shopify Admin API serving bulk operation mutations, polls and results.
+
+    ``statuses`` is consumed one entry per status poll: a status string, or a
+    full response dict (e.g. THROTTLED). The last entry repeats once the script
+    runs out.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.polls = 0
+        self.cancels = []
+        self.polled = asyncio.Event()
+        self.base_url = None
+        self._runner = None
+
+    def _status_response(self):
+        entry = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        if isinstance(entry, dict):
+            return entry
+        node = {"id": OPERATION_ID, "status": entry, "errorCode": None, "objectCount": "0", "url": None}
+        if entry == "COMPLETED":
+            node.update(objectCount="3", fileSize=str(len(RESULTS)), url=f"{self.base_url}/results")
+        return {"data": {"node": node}}
+
+    async def graphql(self, request):
+        query = (await request.json())["query"]
+        if "bulkOperationRunQuery" in query:
+            operation = {"id": OPERATION_ID, "status": "CREATED"}
+            return web.json_response({"data": {"bulkOperationRunQuery": {"bulkOperation": operation, "userErrors": []}}})
+        if "bulkOperationCancel" in query:
+            self.cancels.append(OPERATION_ID)
+            operation = {"id": OPERATION_ID, "status": "CANCELING"}
+            return web.json_response({"data": {"bulkOperationCancel": {"bulkOperation": operation, "userErrors": []}}})
+        self.polls += 1
+        self.polled.set()
+        return web.json_response(self._status_response())
+
+    async def results(self, request):
+        return web.Response(body=RESULTS)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/graphql", self.graphql)
+        app.router.add_get("/results", self.results)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._runner.cleanup()
+
+    def client(self, **kwargs):
+        kwargs.setdefault("poll_interval", 0.01)
+        return AsyncBulkClient(f"{self.base_url}/graphql", {}, **kwargs)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_completed_operation_is_downloaded(tmp_path):
+    async def scenario():
+        async with FakeAdminApi(["RUNNING", "RUNNING", "COMPLETED"]) as api:
+            async with api.client() as client:
+                result = await run_bulk_operation(client, "orders", QUERY_INFO, str(tmp_path))
+            return api, result
+
+    api, result = run(scenario())
+
+    assert result == (3, len(RESULTS))
+    assert (tmp_path / "orders_data.jsonl").read_bytes() == RESULTS
+    assert api.polls == 3
+    assert api.cancels == []
+
+
+def test_timeout_cancels_the_operation(tmp_path):
+    async def scenario():
+        async with FakeAdminApi(["RUNNING"]) as api:
+            async with api.client() as client:
+                result = await run_bulk_operation(client, "orders", QUERY_INFO, str(tmp_path), timeout=0.2)
+            return api, result
+
+    api, result = run(scenario())
+
+    assert result is None
+    assert api.cancels == [OPERATION_ID]
+    assert not (tmp_path / "orders_data.jsonl").exists()
+
+
+def test_throttled_polls_are_retried_until_completion(tmp_path):
+    async def scenario():
+        async with FakeAdminApi([THROTTLED, THROTTLED, THROTTLED, "COMPLETED"]) as api:
+            async with api.client(poll_retries=3) as client:
+                result = await run_bulk_operation(client, "orders", QUERY_INFO, str(tmp_path))
+            return api, result
+
+    api, result = run(scenario())
+
+    assert result == (3, len(RESULTS))
+    assert api.polls == 4
+    assert api.cancels == []
+
+
+def test_operation_is_cancelled_when_polling_gives_up(tmp_path):
+    async def scenario():
+        async with FakeAdminApi([THROTTLED]) as api:
+            async with api.client(poll_retries=2) as client:
+                result = await run_bulk_operation(client, "orders", QUERY_INFO, str(tmp_path))
+            return api, result
+
+    api, result = run(scenario())
+
+    assert result is None
+    assert api.polls == 3
+    assert api.cancels == [OPERATION_ID]
+
+
+def test_cancelling_the_task_cancels_the_operation(tmp_path):
+    async def scenario():
+        async with FakeAdminApi(["RUNNING"]) as api:
+            async with api.client() as client:
+                task = asyncio.create_task(run_bulk_operation(client, "orders", QUERY_INFO, str(tmp_path)))
+                await api.polled.wait()
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            return api
+
+    api = run(scenario())
+
+    assert api.cancels == [OPERATION_ID]
+    assert not (tmp_path / "orders_data.jsonl").exists()
+
+
+def test_one_failing_operation_does_not_abort_its_siblings(tmp_path, monkeypatch):
+    original = async_bulk_client.run_bulk_operation
+
+    async def flaky(client, query_key, *args):
+        if query_key == "bad":
+            raise json.JSONDecodeError("Expecting value", "<html>", 0)
+        return await original(client, query_key, *args)
+
+    monkeypatch.setattr(async_bulk_client, "run_bulk_operation", flaky)
+
+    async def scenario():
+        async with FakeAdminApi(["COMPLETED"]) as api:
+            async with api.client() as client:
+                return await async_bulk_client.run_bulk_operations(
+                    client, {"bad": QUERY_INFO, "good": QUERY_INFO}, str(tmp_path), concurrency=2
+                )
+
+    assert run(scenario()) == {"bad": None, "good": (3, len(RESULTS))}
@@ -0,0 +1,209 @@
+import json
+import os
+import threading
+from collections import Counter
+
+import pytest
+
+bigquery = pytest.importorskip("google.cloud.bigquery")
+pytest.importorskip("dotenv")
+
+import bigquery_export  # noqa: E402
+
+
+class FakeJob:
+    def __init__(self, output_rows=0):
+        self.output_rows = output_rows
+
+    def result(self):
+        return self
+
+
+class FakeTable:
+    def __init__(self, ref, rows=(), schema=()):
+        self.project, self.dataset_id, self.table_id = ref.split(".")
+        self.rows = list(rows)
+        self.schema = list(schema)
+        self.num_rows = len(self.rows)
+        self.expires = None
+
+
+def detect_schema(rows):
+    """Tiny stand-in for BigQuery autodetect: INTEGER / FLOAT / STRING per key."""
+    types = {}
+    for row in rows:
+        for key, value in row.items():
+            if isinstance(value, int):
+                types.setdefault(key, "INTEGER")
+            elif isinstance(value, float):
+                types.setdefault(key, "FLOAT")
+            else:
+                types.setdefault(key, "STRING")
+    return [bigquery.SchemaField(key, field_type) for key, field_type in types.items()]
+
+
+class FakeClient:
+    """In-memory BigQuery client recording every load and copy."""
+
+    project = "proj"
+
+    def __init__(self, failures=None):
+        self.tables = {}
+        self.loads = []
+        self.copies = []
+        self.deleted = []
+        # stage table suffix -> number of times its load should fail
+        self.failures = dict(failures or {})
+        self._lock = threading.Lock()
+
+    def create_table(self, table, exists_ok=False):
+        ref = f"{table.project}.{table.dataset_id}.{table.table_id}"
+        with self._lock:
+            existing = self.tables.setdefault(ref, FakeTable(ref))
+            existing.expires = table.expires
+        return existing
+
+    def load_table_from_file(self, file_obj, ref, job_config, rewind=False, size=None):
+        data = file_obj.read(size) if size is not None else file_obj.read()
+        with self._lock:
+            self.loads.append((ref, data, job_config.autodetect))
+            suffix = ref.rsplit("_", 1)[-1]
+            if self.failures.get(suffix):
+                self.failures[suffix] -= 1
+                raise RuntimeError(f"upload of {suffix} failed")
+        rows = [json.loads(line) for line in data.splitlines() if line.strip()]
+        schema = detect_schema(rows) if job_config.autodetect else job_config.schema
+        with self._lock:
+            table = self.tables.get(ref) or FakeTable(ref)
+            table.rows, table.schema, table.num_rows = rows, list(schema), len(rows)
+            self.tables[ref] = table
+        return FakeJob(len(rows))
+
+    def get_table(self, ref):
+        return self.tables[ref]
+
+    def update_table(self, table, fields):
+        return table
+
+    def copy_table(self, sources, destination, job_config=None):
+        schemas = {tuple(self.tables[s].schema) for s in sources}
+        assert len(schemas) == 1, "copy sources must share one schema"
+        rows = [row for s in sources for row in self.tables[s].rows]
+        self.copies.append((list(sources), destination, job_config.write_disposition))
+        self.tables[destination] = FakeTable(destination, rows, self.tables[sources[0]].schema)
+        return FakeJob()
+
+    def delete_table(self, ref, not_found_ok=False):
+        self.deleted.append(ref)
+        self.tables.pop(ref, None)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(bigquery_export.time, "sleep", lambda seconds: None)
+
+
+def write_jsonl(path, rows):
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    return str(path)
+
+
+def test_shard_ranges_end_on_line_boundaries(tmp_path):
+    path = write_jsonl(tmp_path / "data.jsonl", [{"id": i, "v": "x" * (i % 37)} for i in range(500)])
+    ranges = bigquery_export.shard_ranges(path, 2000)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    assert sum(length for _, length in ranges) == os.path.getsize(path)
+    with open(path, "rb") as f:
+        for offset, length in ranges:
+            f.seek(offset)
+            chunk = f.read(length)
+            assert chunk.endswith(b"\n")
+            assert len(chunk) < 2000 + 100  # at most one line past the target size
+
+
+def test_sharded_load_retries_one_shard_and_commits_with_one_copy(tmp_path):
+    path = write_jsonl(tmp_path / "data.jsonl", [{"id": i, "v": "row"} for i in range(300)])
+    client = FakeClient(failures={"0001": 1})
+
+    bigquery_export.load_jsonl_file(
+        client, "ds", "orders", path, "WRITE_TRUNCATE", shard_size=1000, max_workers=4
+    )
+
+    shard_loads = Counter(ref.rsplit("_", 1)[-1] for ref, _, _ in client.loads)
+    assert shard_loads.pop("0001") == 2
+    assert set(shard_loads.values()) == {1}
+
+    assert len(client.copies) == 1
+    sources, destination, disposition = client.copies[0]
+    assert destination == "proj.ds.orders"
+    assert disposition == "WRITE_TRUNCATE"
+    assert len(sources) == len(shard_loads) + 1
+
+    assert sorted(row["id"] for row in client.tables[destination].rows) == list(range(300))
+    # Every staging table was cleaned up
+    assert sorted(client.deleted) == sorted(sources)
+    assert set(client.tables) == {destination}
+
+
+def test_shards_with_different_schemas_are_reloaded_with_the_merged_schema(tmp_path):
+    rows = [{"id": i} for i in range(100)] + [{"id": i, "late": 1.5} for i in range(100, 110)]
+    path = write_jsonl(tmp_path / "data.jsonl", rows)
+    client = FakeClient()
+
+    bigquery_export.load_jsonl_file(client, "ds", "t", path, "WRITE_APPEND", shard_size=400)
+
+    reloads = [ref for ref, _, autodetect in client.loads if not autodetect]
+    assert reloads, "shards missing the 'late' column should be reloaded"
+    table = client.tables["proj.ds.t"]
+    assert [field.name for field in table.schema] == ["id", "late"]
+    assert len(table.rows) == 110
+    assert len(client.copies) == 1
+
+
+def test_staging_tables_get_an_expiration(tmp_path):
+    path = write_jsonl(tmp_path / "data.jsonl", [{"id": i} for i in range(100)])
+    client = FakeClient()
+    expirations = []
+    original_load = client.load_table_from_file
+
+    def recording_load(file_obj, ref, **kwargs):
+        expirations.append(client.tables[ref].expires)
+        return original_load(file_obj, ref, **kwargs)
+
+    client.load_table_from_file = recording_load
+    bigquery_export.load_jsonl_file(client, "ds", "t", path, "WRITE_TRUNCATE", shard_size=300)
+
+    assert expirations and all(expires is not None for expires in expirations)
+
+
+def test_unloadable_schema_conflicts_raise():
+    with pytest.raises(ValueError, match="'customer'"):
+        bigquery_export.merge_schemas([
+            [bigquery.SchemaField("customer", "RECORD", fields=[bigquery.SchemaField("id", "STRING")])],
+            [bigquery.SchemaField("customer", "STRING")],
+        ])
+    with pytest.raises(ValueError, match="REPEATED"):
+        bigquery_export.merge_schemas([
+            [bigquery.SchemaField("tags", "STRING", mode="REPEATED")],
+            [bigquery.SchemaField("tags", "STRING")],
+        ])
+
+    merged = bigquery_export.merge_schemas([
+        [bigquery.SchemaField("n", "INTEGER"), bigquery.SchemaField("at", "TIMESTAMP")],
+        [bigquery.SchemaField("n", "FLOAT"), bigquery.SchemaField("at", "STRING")],
+    ])
+    assert [(f.name, f.field_type) for f in merged] == [("n", "FLOAT"), ("at", "STRING")]
+
+
+def test_small_files_use_a_single_load(tmp_path):
+    path = write_jsonl(tmp_path / "data.jsonl", [{"id": 1}])
+    client = FakeClient()
+
+    bigquery_export.load_jsonl_file(client, "ds", "t", path, "WRITE_TRUNCATE")
+
+    assert [ref for ref, _, _ in client.loads] == ["proj.ds.t"]
+    assert client.copies == []
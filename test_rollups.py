@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+import rollups  # noqa: E402
+
+
+def money(amount, currency="USD"):
+    return {"shopMoney": {"amount": amount, "currencyCode": currency}}
+
+
+def order(number, updated_at, total, items, customer="1", country="Canada", cancelled_at=None):
+    """An order record followed by its line item records, as in a bulk export."""
+    order_id = f"gid://shopify/Order/{number}"
+    records = [{
+        "id": order_id,
+        "createdAt": "2025-08-05T02:24:33Z",
+        "updatedAt": updated_at,
+        "cancelledAt": cancelled_at,
+        "currencyCode": "USD",
+        "totalPriceSet": money(total),
+        "customer": {"id": f"gid://shopify/Customer/{customer}"},
+        "shippingAddress": {"country": country, "province": "Ontario"},
+    }]
+    for i, (product, quantity, price) in enumerate(items):
+        records.append({
+            "id": f"gid://shopify/LineItem/{number}{i}",
+            "quantity": quantity,
+            "originalUnitPriceSet": money(price),
+            "product": {"id": f"gid://shopify/Product/{product}"},
+            "__parentId": order_id,
+        })
+    return records
+
+
+def write_jsonl(path, *orders):
+    with open(path, "w") as f:
+        for records in orders:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return str(path)
+
+
+def snapshot(con):
+    return sorted(con.execute("SELECT * FROM rollups").fetchall())
+
+
+def rollups_of(tmp_path, name, *orders):
+    """Rollups computed from scratch over exactly ``orders``."""
+    con = rollups.connect(str(tmp_path / f"{name}.sqlite"))
+    rollups.apply_orders_file(con, write_jsonl(tmp_path / f"{name}.jsonl", *orders))
+    return snapshot(con)
+
+
+FIRST = order(1, "2025-08-05T03:00:00Z", "39.97", [("10", 3, "13.99")], customer="1")
+SECOND = order(2, "2025-08-05T04:00:00Z", "0.30", [("10", 1, "0.1"), ("20", 2, "0.1")], customer="2", country="France")
+
+
+def test_updated_order_retraction_cancels_its_insertion_exactly(tmp_path):
+    con = rollups.connect(str(tmp_path / "rollups.sqlite"))
+    assert rollups.apply_orders_file(con, write_jsonl(tmp_path / "full.jsonl", FIRST, SECOND)) == (2, 0)
+
+    edited = order(2, "2025-08-06T00:00:00Z", "20.33", [("20", 1, "0.33"), ("30", 4, "5.0")], customer="3", country="Peru")
+    assert rollups.apply_orders_file(con, write_jsonl(tmp_path / "changes.jsonl", edited)) == (1, 0)
+
+    assert snapshot(con) == rollups_of(tmp_path, "expected", FIRST, edited)
+    assert rollups.get_watermark(con) == "2025-08-06T00:00:00Z"
+
+
+def test_cancelled_order_is_removed_from_every_dimension(tmp_path):
+    con = rollups.connect(str(tmp_path / "rollups.sqlite"))
+    rollups.apply_orders_file(con, write_jsonl(tmp_path / "full.jsonl", FIRST, SECOND))
+
+    cancelled = order(
+        2, "2025-08-06T00:00:00Z", "0.30", [("10", 1, "0.1"), ("20", 2, "0.1")],
+        customer="2", country="France", cancelled_at="2025-08-06T00:00:00Z",
+    )
+    rollups.apply_orders_file(con, write_jsonl(tmp_path / "changes.jsonl", cancelled))
+
+    assert snapshot(con) == rollups_of(tmp_path, "expected", FIRST)
+    keys = {key for _, _, key, *_ in snapshot(con)}
+    assert "gid://shopify/Customer/2" not in keys
+    assert "France/Ontario" not in keys
+    assert "gid://shopify/Product/20" not in keys
+
+
+def test_groups_whose_orders_are_all_retracted_are_deleted(tmp_path):
+    con = rollups.connect(str(tmp_path / "rollups.sqlite"))
+    rollups.apply_orders_file(con, write_jsonl(tmp_path / "full.jsonl", FIRST))
+
+    cancelled = order(1, "2025-08-06T00:00:00Z", "39.97", [("10", 3, "13.99")], cancelled_at="2025-08-06T00:00:00Z")
+    rollups.apply_orders_file(con, write_jsonl(tmp_path / "changes.jsonl", cancelled))
+
+    assert snapshot(con) == []
+    assert con.execute("SELECT COUNT(*) FROM rollups WHERE orders = 0").fetchone() == (0,)
+
+
+def test_stale_versions_are_skipped(tmp_path):
+    con = rollups.connect(str(tmp_path / "rollups.sqlite"))
+    rollups.apply_orders_file(con, write_jsonl(tmp_path / "full.jsonl", FIRST, SECOND))
+    before = snapshot(con)
+
+    older = order(2, "2025-08-05T01:00:00Z", "99.00", [("99", 9, "11.0")], customer="9")
+    same = order(1, "2025-08-05T03:00:00Z", "1.00", [("10", 1, "1.0")])
+    assert rollups.apply_orders_file(con, write_jsonl(tmp_path / "stale.jsonl", older, same)) == (0, 2)
+
+    assert snapshot(con) == before
+    assert rollups.get_watermark(con) == "2025-08-05T04:00:00Z"
+
+
+def test_reapplying_the_same_file_without_updated_at_does_not_double_count(tmp_path):
+    con = rollups.connect(str(tmp_path / "rollups.sqlite"))
+    undated = [dict(record, updatedAt=None) if "createdAt" in record else record for record in FIRST]
+    path = write_jsonl(tmp_path / "full.jsonl", undated, SECOND)
+
+    rollups.apply_orders_file(con, path)
+    once = snapshot(con)
+    rollups.apply_orders_file(con, path)
+
+    assert snapshot(con) == once